@@ -7,9 +7,12 @@ Usage:
     python run_automated_analysis.py
 """
 
+import hashlib
 import sys
 from pathlib import Path
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import os
 
 # Fix Windows console encoding for Unicode characters
@@ -24,7 +27,7 @@ sys.path.insert(0, str(Path(__file__).parent / "src"))
 from scrapers.youtube_scraper import YouTubeScraper
 from scrapers.steam_scraper import SteamScraperSimple
 from preprocessing import TextCleaner, TextPreprocessor
-from analysis.sentiment_classifier import NegativeSentimentClassifier
+from analysis.sentiment_classifier import get_classifier
 import pandas as pd
 import yaml
 from dotenv import load_dotenv
@@ -32,12 +35,14 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Horizontal rules used by the console output
+BANNER_RULE = "=" * 80
+DIVIDER = "-" * 80
+
 
 def print_banner(text):
     """Print a formatted banner"""
-    print("\n" + "=" * 80)
-    print(f"  {text}")
-    print("=" * 80)
+    print(f"\n{BANNER_RULE}\n  {text}\n{BANNER_RULE}")
 
 
 def scrape_youtube_comments(config):
@@ -58,12 +63,16 @@ def scrape_youtube_comments(config):
         print("Skipping YouTube scraping...")
         return None
     
-    scraper = YouTubeScraper(api_key)
+    scraper = YouTubeScraper(api_key, youtube_config.get('requests_per_second', 10),
+                             youtube_config.get('cache_dir'))
     max_comments = youtube_config.get('max_comments', 1000)
     include_replies = youtube_config.get('include_replies', True)
     
     print(f"📹 Scraping from {len(video_ids)} video(s)...")
-    all_comments = scraper.scrape_multiple_videos(video_ids, max_comments)
+    
+    # Videos are scraped concurrently over one pooled session
+    with scraper:
+        all_comments = scraper.scrape_multiple_videos(video_ids, max_comments)
     
     if all_comments:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -87,15 +96,14 @@ def scrape_steam_reviews(config):
         print("Skipping Steam scraping...")
         return None
     
-    scraper = SteamScraperSimple()
+    scraper = SteamScraperSimple(steam_config.get('cache_dir'))
     max_reviews = steam_config.get('max_reviews', 1000)
     
-    all_reviews = []
     print(f"🎮 Scraping from {len(game_ids)} game(s)...")
     
-    for game_id in game_ids:
-        reviews = scraper.scrape_reviews(game_id, max_reviews)
-        all_reviews.extend(reviews)
+    # Games are scraped concurrently over one pooled session
+    with scraper:
+        all_reviews = scraper.scrape_multiple_games(game_ids, max_reviews)
         print()
     
     if all_reviews:
@@ -108,106 +116,235 @@ def scrape_steam_reviews(config):
     return None
 
 
-def preprocess_data(input_files, config):
-    """Preprocess all scraped data"""
-    print_banner("STEP 3: PREPROCESSING DATA")
+# Rows read from each scraped file at a time, so memory stays flat on large scrapes
+CHUNK_SIZE = 50_000
+
+# Columns that may hold the comment text, in order of preference
+TEXT_COLUMNS = ('text', 'comment', 'review')
+
+# dtype the text column is read with
+TEXT_DTYPE = 'string[pyarrow]'
+
+
+def find_text_column(columns):
+    """Return the first known text column in columns, or None"""
+    for col in TEXT_COLUMNS:
+        if col in columns:
+            return col
+    return None
+
+
+def get_output_columns(input_files):
+    """Column layout of the combined classified output for all input files"""
+    columns = []
     
-    if not input_files:
-        print("❌ No data files to preprocess")
-        return None
+    for file_path in input_files:
+        if file_path and os.path.exists(file_path):
+            file_columns = list(pd.read_csv(file_path, nrows=0).columns)
+            for col in file_columns + ['preprocessed_text', 'text']:
+                if col not in columns:
+                    columns.append(col)
     
-    # Initialize preprocessor
-    preprocessor = TextPreprocessor(
-        use_cleaner=True,
-        cleaner_config={
-            'remove_urls': True,
-            'remove_html': True,
-            'remove_emails': True,
-            'remove_extra_whitespace': True,
-            'lowercase': False  # Keep original case for better sentiment analysis
-        }
+    return columns + ['sentiment_label', 'negative_score', 'positive_score', 'is_negative']
+
+
+# Cleaner settings used for every scraped file
+CLEANER_CONFIG = {
+    'remove_urls': True,
+    'remove_html': True,
+    'remove_emails': True,
+    'remove_extra_whitespace': True,
+    'lowercase': False  # Keep original case for better sentiment analysis
+}
+
+# Preprocessor owned by each worker process
+_worker_preprocessor = None
+
+
+def _init_preprocess_worker(cleaner_config):
+    """Create the preprocessor once per worker process"""
+    global _worker_preprocessor
+    _worker_preprocessor = TextPreprocessor(use_cleaner=True, cleaner_config=cleaner_config)
+
+
+def _preprocess_chunk(df, text_col):
+    """Preprocess one chunk in a worker process"""
+    if text_col is None:
+        # Raw rows are kept; with no text they are classified as empty text
+        df['text'] = None
+        return df
+    
+    df = _worker_preprocessor.preprocess_dataframe(
+        df, 
+        text_column=text_col,
+        output_column='preprocessed_text'
     )
     
-    combined_data = []
+    # Standardize column name to 'text', keeping the original too
+    if text_col != 'text':
+        df['text'] = df[text_col]
     
+    return df
+
+
+def read_chunks(input_files):
+    """Yield (chunk, text_column) pairs from every readable input file (text_column may be None)"""
     for file_path in input_files:
         if file_path and os.path.exists(file_path):
             print(f"📂 Loading: {file_path}")
-            df = pd.read_csv(file_path)
-            
-            # Identify text column
-            text_col = None
-            if 'text' in df.columns:
-                text_col = 'text'
-            elif 'comment' in df.columns:
-                text_col = 'comment'
-            elif 'review' in df.columns:
-                text_col = 'review'
+            text_col = find_text_column(pd.read_csv(file_path, nrows=0).columns)
             
             if text_col:
                 print(f"   Preprocessing '{text_col}' column...")
-                df = preprocessor.preprocess_dataframe(
-                    df, 
-                    text_column=text_col,
-                    output_column='preprocessed_text'
-                )
-                # Keep both original and preprocessed
-                combined_data.append(df)
+                # Arrow-backed text keeps each chunk in one contiguous buffer,
+                # which is smaller in memory and cheaper to ship to the workers
+                dtype = {text_col: TEXT_DTYPE}
             else:
                 print(f"   ⚠️  Warning: No text column found, using raw data")
-                combined_data.append(df)
-    
-    if combined_data:
-        # Combine all data
-        combined_df = pd.concat(combined_data, ignore_index=True)
+                dtype = None
+            
+            for df in pd.read_csv(file_path, chunksize=CHUNK_SIZE, dtype=dtype):
+                yield df, text_col
+
+
+def preprocess_data(input_files, config):
+    """Preprocess all scraped data in worker processes, yielding chunks in order"""
+    # Leave one core for the classifier consuming the chunks
+    workers = max(1, (os.cpu_count() or 2) - 1)
+    
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_preprocess_worker,
+                             initargs=(CLEANER_CONFIG,)) as executor:
+        pending = deque()
         
-        # Standardize column name to 'text'
-        if 'text' not in combined_df.columns:
-            if 'review' in combined_df.columns:
-                combined_df['text'] = combined_df['review']
-            elif 'comment' in combined_df.columns:
-                combined_df['text'] = combined_df['comment']
+        for df, text_col in read_chunks(input_files):
+            pending.append(executor.submit(_preprocess_chunk, df, text_col))
+            
+            # Bound the chunks in flight so memory stays flat
+            if len(pending) > workers:
+                yield pending.popleft().result()
         
-        print(f"\n✅ Preprocessing complete: {len(combined_df)} total comments")
-        return combined_df
+        while pending:
+            yield pending.popleft().result()
+
+
+# Negative scores from the previous run, so unchanged comments aren't classified
+# again; one file per classifier scoring setup
+MANIFEST_DIR = Path('results') / '.manifest'
+
+
+def text_hashes(texts):
+    """64-bit hash of each text, the key of the score manifest"""
+    return pd.util.hash_pandas_object(texts, index=False).to_numpy()
+
+
+def manifest_file(scoring_setup):
+    """Manifest path for one classifier scoring setup"""
+    key = hashlib.sha1(repr(scoring_setup).encode()).hexdigest()[:16]
+    return MANIFEST_DIR / f'{key}.parquet'
+
+
+def load_manifest(path):
+    """Load a score manifest as negative scores indexed by text hash, empty if missing"""
+    if path.exists():
+        return pd.read_parquet(path).set_index('text_hash')['negative_score']
     
-    return None
+    return pd.Series(dtype='float32', index=pd.Index([], dtype='uint64', name='text_hash'),
+                     name='negative_score')
+
+
+def reuse_manifest_scores(chunks, classifier, known_scores):
+    """Seed the classifier with manifest scores for texts seen in earlier runs"""
+    for chunk in chunks:
+        texts = chunk['text'].fillna('')
+        scores = known_scores.reindex(text_hashes(texts)).to_numpy()
+        seen = ~pd.isna(scores)
+        
+        if seen.any():
+            classifier.remember_scores(texts[seen], scores[seen])
+        
+        yield chunk
 
 
-def classify_negative_comments(df, config):
-    """Classify and filter negative comments"""
-    print_banner("STEP 4: CLASSIFYING NEGATIVE COMMENTS")
+def classify_negative_comments(input_files, config, output_file):
+    """Preprocess and classify comments chunk by chunk, streaming all rows to output_file"""
+    print_banner("STEP 3: PREPROCESSING AND CLASSIFYING COMMENTS")
     
-    if df is None or df.empty:
-        print("❌ No data to classify")
-        return None, None
+    if not input_files:
+        print("❌ No data files to preprocess")
+        return 0, None
     
     # Initialize classifier
-    classifier = NegativeSentimentClassifier(config_path='config.yaml')
+    classifier = get_classifier(config_path='config.yaml')
+    
+    # Scores the same scoring setup produced in the previous run, by text hash
+    manifest_path = manifest_file(classifier.scoring_setup)
+    known_scores = load_manifest(manifest_path)
+    
+    columns = get_output_columns(input_files)
+    total = 0
+    header_written = False
+    negative_chunks = []
+    new_scores = []
+    
+    chunks = reuse_manifest_scores(preprocess_data(input_files, config),
+                                   classifier, known_scores)
+    for chunk in classifier.classify_stream(chunks):
+        # VADER estimates are not model scores, so they are never saved
+        prescreened = chunk.pop('prescreened') if 'prescreened' in chunk.columns else None
+        scored = chunk if prescreened is None else chunk[~prescreened.to_numpy()]
+        
+        chunk.reindex(columns=columns).to_csv(
+            output_file, mode='a', header=not header_written, index=False
+        )
+        header_written = True
+        total += len(chunk)
+        negative_chunks.append(chunk[chunk['is_negative']])
+        new_scores.append(pd.DataFrame({
+            'text_hash': text_hashes(scored['text'].fillna('')),
+            'negative_score': scored['negative_score'].to_numpy(),
+        }))
+    
+    if total == 0:
+        print("❌ No data to classify")
+        return 0, None
+    
+    print(f"\n✅ Classified {total} comments")
+    print(f"💾 All comments saved: {output_file}")
+    
+    # Remember this run's scores for the next run; texts not seen this run
+    # are dropped, so the manifest never outgrows one run's comments
+    manifest = pd.concat(new_scores, ignore_index=True).drop_duplicates('text_hash', keep='last')
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    manifest.to_parquet(manifest_path, index=False)
     
-    # Filter negative comments
-    negative_comments = classifier.filter_negative_comments(df)
+    # Most negative first
+    negative_comments = pd.concat(negative_chunks, ignore_index=True)
+    negative_comments = negative_comments.sort_values('negative_score', ascending=False)
     
     if negative_comments.empty:
         print("ℹ️  No negative comments found")
-        return df, None
+        return total, None
     
     # Get statistics
     stats = classifier.analyze_negative_comments(negative_comments)
     
-    print("\n" + "📊 NEGATIVE COMMENT STATISTICS")
-    print("-" * 80)
-    print(f"Total comments analyzed: {len(df)}")
-    print(f"Negative comments found: {stats['total_negative']}")
-    print(f"Negative rate: {stats['total_negative']/len(df)*100:.1f}%")
-    print(f"\nAverage negative score: {stats['avg_negative_score']:.3f}")
-    print(f"Median negative score: {stats['median_negative_score']:.3f}")
-    print(f"\nBreakdown by severity:")
-    print(f"  🔴 Highly negative (≥0.8):      {stats['highly_negative_count']}")
-    print(f"  🟠 Moderately negative (0.6-0.8): {stats['moderately_negative_count']}")
-    print(f"  🟡 Mildly negative (<0.6):       {stats['mildly_negative_count']}")
-    
-    return df, negative_comments
+    # One write for the whole block
+    print("\n".join([
+        "\n" + "📊 NEGATIVE COMMENT STATISTICS",
+        DIVIDER,
+        f"Total comments analyzed: {total}",
+        f"Negative comments found: {stats['total_negative']}",
+        f"Negative rate: {stats['total_negative']/total*100:.1f}%",
+        f"\nAverage negative score: {stats['avg_negative_score']:.3f}",
+        f"Median negative score: {stats['median_negative_score']:.3f}",
+        f"\nBreakdown by severity:",
+        f"  🔴 Highly negative (≥0.8):      {stats['highly_negative_count']}",
+        f"  🟠 Moderately negative (0.6-0.8): {stats['moderately_negative_count']}",
+        f"  🟡 Mildly negative (<0.6):       {stats['mildly_negative_count']}",
+    ]))
+    
+    return total, negative_comments
 
 
 def display_top_negatives(negative_df, top_n=10):
@@ -220,37 +357,34 @@ def display_top_negatives(negative_df, top_n=10):
     
     text_col = 'text' if 'text' in negative_df.columns else 'comment'
     
-    for i, (idx, row) in enumerate(negative_df.head(top_n).iterrows(), 1):
-        print(f"\n{i}. NEGATIVE SCORE: {row['negative_score']:.3f}")
-        comment_text = str(row[text_col])[:200]
-        print(f"   {comment_text}{'...' if len(str(row[text_col])) > 200 else ''}")
+    # Source shown under each comment, if available
+    if 'video_title' in negative_df.columns:
+        source_col, source_label = 'video_title', "📹 Source: "
+    elif 'app_id' in negative_df.columns:
+        source_col, source_label = 'app_id', "🎮 Source: Steam App ID "
+    else:
+        source_col = None
+    
+    columns = ['negative_score', text_col] + ([source_col] if source_col else [])
+    rows = negative_df.head(top_n)[columns].itertuples(index=False, name=None)
+    
+    for i, (score, text, *source) in enumerate(rows, 1):
+        print(f"\n{i}. NEGATIVE SCORE: {score:.3f}")
+        comment_text = str(text)
+        print(f"   {comment_text[:200]}{'...' if len(comment_text) > 200 else ''}")
         
-        # Show source if available
-        if 'video_title' in row:
-            print(f"   📹 Source: {row['video_title']}")
-        elif 'app_id' in row:
-            print(f"   🎮 Source: Steam App ID {row['app_id']}")
+        if source:
+            print(f"   {source_label}{source[0]}")
         
-        print("-" * 80)
+        print(DIVIDER)
 
 
-def save_results(all_comments_df, negative_df):
-    """Save results to CSV files"""
-    print_banner("STEP 5: SAVING RESULTS")
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    results_dir = Path('results')
-    results_dir.mkdir(exist_ok=True)
+def save_results(negative_df, results_dir, timestamp):
+    """Save negative comment results to CSV files"""
+    print_banner("STEP 4: SAVING RESULTS")
     
     saved_files = []
     
-    # Save all classified comments
-    if all_comments_df is not None and not all_comments_df.empty:
-        all_file = results_dir / f'all_comments_classified_{timestamp}.csv'
-        all_comments_df.to_csv(all_file, index=False)
-        print(f"💾 All comments saved: {all_file}")
-        saved_files.append(str(all_file))
-    
     # Save negative comments
     if negative_df is not None and not negative_df.empty:
         neg_file = results_dir / f'negative_comments_{timestamp}.csv'
@@ -271,10 +405,10 @@ def save_results(all_comments_df, negative_df):
 
 def main():
     """Main automated pipeline"""
-    print("\n")
-    print("╔" + "═" * 78 + "╗")
-    print("║" + " " * 20 + "AUTOMATED COMMENT ANALYSIS PIPELINE" + " " * 23 + "║")
-    print("╚" + "═" * 78 + "╝")
+    print("\n\n"
+          "╔" + "═" * 78 + "╗\n"
+          "║" + " " * 20 + "AUTOMATED COMMENT ANALYSIS PIPELINE" + " " * 23 + "║\n"
+          "╚" + "═" * 78 + "╝")
     
     start_time = datetime.now()
     
@@ -297,22 +431,24 @@ def main():
         print("\n❌ No data was scraped. Please check your configuration and API keys.")
         return
     
-    # Step 3: Preprocess
-    combined_df = preprocess_data(scraped_files, config)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_dir = Path('results')
+    results_dir.mkdir(exist_ok=True)
+    all_file = results_dir / f'all_comments_classified_{timestamp}.csv'
     
-    if combined_df is None:
-        print("\n❌ Preprocessing failed.")
-        return
+    # Step 3: Preprocess and classify, streaming every comment to all_file
+    total, negative_df = classify_negative_comments(scraped_files, config, all_file)
     
-    # Step 4: Classify
-    all_comments_df, negative_df = classify_negative_comments(combined_df, config)
+    if not total:
+        print("\n❌ No comments were classified.")
+        return
     
     # Display top negatives
     if negative_df is not None and not negative_df.empty:
         display_top_negatives(negative_df, top_n=10)
     
-    # Step 5: Save results
-    saved_files = save_results(all_comments_df, negative_df)
+    # Step 4: Save results
+    saved_files = [str(all_file)] + save_results(negative_df, results_dir, timestamp)
     
     # Summary
     print_banner("ANALYSIS COMPLETE!")
@@ -1,5 +1,5 @@
 """Analysis module for comment sentiment classification."""
 
-from .sentiment_classifier import NegativeSentimentClassifier
+from .sentiment_classifier import NegativeSentimentClassifier, get_classifier
 
-__all__ = ['NegativeSentimentClassifier']
+__all__ = ['NegativeSentimentClassifier', 'get_classifier']
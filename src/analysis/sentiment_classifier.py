@@ -1,6 +1,14 @@
 """
 Sentiment Classifier focused on identifying negative comments.
 """
+import inspect
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 import torch
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
 import pandas as pd
@@ -9,6 +17,13 @@ import yaml
 from pathlib import Path
 
 
+# Exported and optimized ONNX graphs, one subdirectory per model name
+ONNX_CACHE_DIR = Path("models") / "onnx"
+
+# Texts whose scores are kept between classify_batch() calls by default
+SCORE_CACHE_SIZE = 100_000
+
+
 class NegativeSentimentClassifier:
     """Classifier specifically designed to identify and analyze negative comments."""
     
@@ -21,15 +36,149 @@ class NegativeSentimentClassifier:
         self.model_name = self.classifier_config['model']
         self.batch_size = self.classifier_config['batch_size']
         self.negative_threshold = self.classifier_config['negative_threshold']
+        self.quantize = self.classifier_config.get('quantize', False)
+        self.compile = self.classifier_config.get('compile', False)
+        self.onnx = self.classifier_config.get('onnx', False)
+        self.prescreen_threshold = self.classifier_config.get('prescreen_threshold')
+        self.score_cache_size = self.classifier_config.get('score_cache_size', SCORE_CACHE_SIZE)
         
         print(f"Loading model: {self.model_name}")
-        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name, use_fast=True)
         
         # Use GPU if available
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model.to(self.device)
+        
+        # Fused ONNX Runtime graph on CPU; replaces the PyTorch model, which
+        # is then not kept in memory (it is only loaded to export the graph)
+        self.model = None
+        self.onnx_session = None
+        if self.onnx and self.device.type == "cpu":
+            self.onnx_session = self._load_onnx_session()
+            self.onnx_inputs = {i.name for i in self.onnx_session.get_inputs()}
+            print("Using ONNX Runtime optimized graph")
+        else:
+            self.model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            self.model.eval()
+            
+            # Quantize Linear layers to INT8 on CPU (dynamic quantization is CPU-only)
+            if self.quantize and self.device.type == "cpu":
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                print("Applied dynamic INT8 quantization")
+            
+            self.model.to(self.device)
+            
+            # Half precision (and optionally a compiled graph) on GPU
+            if self.device.type == "cuda":
+                torch.backends.cuda.matmul.allow_tf32 = True
+                dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+                self.model = self.model.to(dtype)
+                if self.compile:
+                    # Batches vary in length, so compile for dynamic shapes
+                    self.model = torch.compile(self.model, dynamic=True)
+        
         print(f"Using device: {self.device}")
+        
+        # Everything that changes the model's scores; saved scores are
+        # only reusable by a classifier with the same setup. The prescreen
+        # is left out: its estimates are never saved
+        self.scoring_setup = (
+            self.model_name,
+            self.device.type,
+            bool(self.quantize) and self.device.type == "cpu",
+            self.onnx_session is not None,
+        )
+        
+        # Cheap lexicon scorer used to skip the model for clearly positive texts
+        self.prescreen = None
+        if self.prescreen_threshold is not None:
+            from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+            self.prescreen = SentimentIntensityAnalyzer()
+        
+        # Negative scores of the most recently seen texts (positive is 1 - negative),
+        # least recently used first; bounded so long streams keep memory flat
+        self._score_cache = OrderedDict()
+    
+    def _load_onnx_session(self):
+        """
+        Build (or reuse from disk) an optimized ONNX graph of the model.
+        
+        The model is exported once, its LayerNorm/attention/GELU subgraphs
+        are fused by ONNX Runtime's transformer optimizer, and with
+        quantize enabled the fused graph gets INT8 weights.
+        
+        Returns:
+            onnxruntime.InferenceSession: Session on the CPU provider
+        """
+        import onnxruntime as ort
+        
+        cache_dir = ONNX_CACHE_DIR / self.model_name.replace("/", "--")
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        raw_path = cache_dir / "model.onnx"
+        opt_path = cache_dir / "model_opt.onnx"
+        int8_path = cache_dir / "model_opt_int8.onnx"
+        
+        if not raw_path.exists():
+            print(f"Exporting ONNX model to {raw_path}")
+            # Loaded only for the export and released right after it
+            model = AutoModelForSequenceClassification.from_pretrained(self.model_name)
+            model.eval()
+            sample = self.tokenizer(["Exporting the model"], return_tensors="pt")
+            # Graph inputs must follow the order of the model's forward() arguments
+            names = [n for n in inspect.signature(model.forward).parameters if n in sample]
+            axes = {n: {0: "batch", 1: "sequence"} for n in names}
+            torch.onnx.export(
+                model, ({n: sample[n] for n in names},), str(raw_path),
+                input_names=names, output_names=["logits"],
+                dynamic_axes={**axes, "logits": {0: "batch"}},
+                opset_version=17,
+            )
+            del model
+        
+        if not opt_path.exists():
+            from onnxruntime.transformers.optimizer import optimize_model
+            
+            # num_heads/hidden_size of 0 are read from the graph itself
+            optimized = optimize_model(str(raw_path), model_type="bert",
+                                       num_heads=0, hidden_size=0, use_gpu=False)
+            optimized.save_model_to_file(str(opt_path))
+        
+        model_path = opt_path
+        if self.quantize:
+            if not int8_path.exists():
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+                quantize_dynamic(str(opt_path), str(int8_path), weight_type=QuantType.QInt8)
+            model_path = int8_path
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        return ort.InferenceSession(str(model_path), sess_options=options,
+                                    providers=["CPUExecutionProvider"])
+    
+    def _negative_scores(self, inputs):
+        """
+        Run one tokenized batch through the model.
+        
+        Args:
+            inputs: Model inputs, NumPy arrays for the ONNX session and
+                tensors on self.device otherwise
+            
+        Returns:
+            np.ndarray: Negative class probability of each row
+        """
+        if self.onnx_session is not None:
+            logits = self.onnx_session.run(None, inputs)[0].astype(np.float32)
+            probs = np.exp(logits - logits.max(axis=-1, keepdims=True))
+            # Index 0 is negative for the SST-2 model
+            return probs[:, 0] / probs.sum(axis=-1)
+        
+        with torch.inference_mode():
+            outputs = self.model(**inputs)
+            # Index 0 is negative for the SST-2 model; one device sync per batch
+            return torch.softmax(outputs.logits.float(), dim=-1)[:, 0].cpu().numpy()
     
     def classify_comment(self, text):
         """
@@ -41,17 +190,18 @@ class NegativeSentimentClassifier:
         Returns:
             dict: Contains label ('NEGATIVE' or 'POSITIVE'), score, and is_negative flag
         """
-        inputs = self.tokenizer(text, return_tensors="pt", truncation=True, 
-                               max_length=512, padding=True)
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
+        if self.onnx_session is not None:
+            inputs = self.tokenizer(text, return_tensors="np", truncation=True, 
+                                   max_length=512, padding=True)
+            inputs = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.onnx_inputs}
+        else:
+            inputs = self.tokenizer(text, return_tensors="pt", truncation=True, 
+                                   max_length=512, padding=True)
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
         
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+        negative_score = float(self._negative_scores(inputs)[0])
         
-        # Get negative sentiment score (index 0 is negative for SST-2 model)
-        negative_score = predictions[0][0].item()
-        positive_score = predictions[0][1].item()
+        positive_score = 1.0 - negative_score
         
         label = "NEGATIVE" if negative_score > positive_score else "POSITIVE"
         is_negative = negative_score >= self.negative_threshold
@@ -63,84 +213,239 @@ class NegativeSentimentClassifier:
             'is_negative': is_negative
         }
     
-    def classify_batch(self, texts):
+    def classify_batch(self, texts, return_prescreened=False):
         """
         Classify multiple comments in batch for efficiency.
         
+        Duplicate texts in the batch, and texts still in the score cache
+        from earlier calls, are only run through the model once.
+        
         Args:
             texts: List of comment texts
+            return_prescreened: Also return which texts got a VADER
+                estimate instead of a model score
             
         Returns:
-            list: List of classification results
+            np.ndarray: float32 negative scores aligned with texts; the
+                positive score of each text is 1 - negative score. With
+                return_prescreened, a (scores, prescreened) pair where
+                prescreened is a bool array aligned with texts
+        """
+        scores = {}
+        pending = []
+        
+        for text in dict.fromkeys(texts):
+            if text in self._score_cache:
+                self._score_cache.move_to_end(text)
+                scores[text] = self._score_cache[text]
+            else:
+                pending.append(text)
+        
+        prescreened = {}
+        if pending and self.prescreen is not None:
+            pending = self._prescreen_texts(pending, prescreened)
+        if pending:
+            self._score_texts(pending, scores)
+        
+        # Only model scores are cached; prescreen estimates are cheap to redo
+        self.remember_scores(scores.keys(), scores.values())
+        scores.update(prescreened)
+        
+        negative_scores = np.array([scores[t] for t in texts], dtype=np.float32)
+        if return_prescreened:
+            return negative_scores, np.array([t in prescreened for t in texts], dtype=bool)
+        return negative_scores
+    
+    def remember_scores(self, texts, negative_scores):
         """
-        results = []
+        Seed the score cache with already known negative scores.
+        
+        Seeded texts are not run through the model again, e.g. when
+        reusing the scores saved by an earlier run; they must come from
+        a classifier with the same scoring_setup.
         
-        for i in tqdm(range(0, len(texts), self.batch_size), desc="Classifying comments"):
-            batch = texts[i:i + self.batch_size]
+        Only the score_cache_size most recently used texts are kept.
+        
+        Args:
+            texts: Comment texts
+            negative_scores: Negative score of each text
+        """
+        cache = self._score_cache
+        
+        for text, score in zip(texts, negative_scores):
+            cache[text] = score
+            cache.move_to_end(text)
+        
+        while len(cache) > self.score_cache_size:
+            cache.popitem(last=False)
+    
+    def _prescreen_texts(self, texts, scores):
+        """
+        Score clearly positive texts with VADER instead of the model.
+        
+        Texts whose VADER compound score reaches prescreen_threshold get
+        an approximate negative score of (1 - compound) / 2, stored in scores.
+        
+        Returns:
+            list: The texts that still need to go through the model
+        """
+        remaining = []
+        
+        for text in texts:
+            compound = self.prescreen.polarity_scores(text)['compound']
+            if compound >= self.prescreen_threshold:
+                scores[text] = (1 - compound) / 2
+            else:
+                remaining.append(text)
+        
+        return remaining
+    
+    def _score_texts(self, texts, scores):
+        """Run the model over texts and store their negative scores in scores."""
+        # Tokenize everything once; each batch is padded to its own longest text
+        encodings = self.tokenizer(texts, truncation=True, max_length=512)
+        
+        # Batch texts of similar length together to minimise padding
+        lengths = [len(ids) for ids in encodings['input_ids']]
+        order = np.argsort(lengths, kind='stable')
+        
+        pad_values = {
+            'input_ids': self.tokenizer.pad_token_id or 0,
+            'token_type_ids': self.tokenizer.pad_token_type_id,
+        }
+        pad_left = self.tokenizer.padding_side == 'left'
+        # Page-locked host memory lets the copy to the GPU run asynchronously
+        pin_memory = self.device.type == "cuda"
+        
+        def prepare_batch(start):
+            indices = order[start:start + self.batch_size]
+            width = lengths[indices[-1]]  # longest in the batch, as order is sorted
+            inputs = {}
             
-            inputs = self.tokenizer(batch, return_tensors="pt", truncation=True,
-                                   max_length=512, padding=True)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            for key, values in encodings.items():
+                if self.onnx_session is not None and key not in self.onnx_inputs:
+                    continue
+                
+                batch = np.full((len(indices), width), pad_values.get(key, 0), dtype=np.int64)
+                for row, j in enumerate(indices):
+                    if pad_left:
+                        batch[row, width - lengths[j]:] = values[j]
+                    else:
+                        batch[row, :lengths[j]] = values[j]
+                
+                if self.onnx_session is not None:
+                    inputs[key] = batch
+                    continue
+                
+                tensor = torch.from_numpy(batch)
+                if pin_memory:
+                    tensor = tensor.pin_memory()
+                inputs[key] = tensor.to(self.device, non_blocking=True)
             
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                predictions = torch.nn.functional.softmax(outputs.logits, dim=-1)
+            return inputs
+        
+        # Throttled progress bar, disabled entirely when stderr is not a terminal
+        progress = tqdm(total=len(texts), desc="Classifying comments",
+                        mininterval=0.5, smoothing=0.1,
+                        disable=not sys.stderr.isatty())
+        
+        # Prepare the next batch in the background while the model runs
+        with ThreadPoolExecutor(max_workers=1) as executor, progress:
+            next_inputs = executor.submit(prepare_batch, 0)
             
-            for pred in predictions:
-                negative_score = pred[0].item()
-                positive_score = pred[1].item()
+            for i in range(0, len(texts), self.batch_size):
+                inputs = next_inputs.result()
+                if i + self.batch_size < len(texts):
+                    next_inputs = executor.submit(prepare_batch, i + self.batch_size)
                 
-                label = "NEGATIVE" if negative_score > positive_score else "POSITIVE"
-                is_negative = negative_score >= self.negative_threshold
+                negative = self._negative_scores(inputs)
                 
-                results.append({
-                    'label': label,
-                    'negative_score': negative_score,
-                    'positive_score': positive_score,
-                    'is_negative': is_negative
-                })
-        
-        return results
+                for idx, score in zip(order[i:i + self.batch_size], negative.tolist()):
+                    scores[texts[idx]] = score
+                
+                progress.update(len(negative))
     
-    def filter_negative_comments(self, comments_df):
+    def filter_negative_comments(self, comments_df, text_column=None):
         """
         Filter and classify comments, returning only negative ones.
         
         Args:
             comments_df: DataFrame with 'text' or 'comment' column
+            text_column: Column to classify instead (e.g. 'preprocessed_text'),
+                so callers don't need to copy the frame to rename it
             
         Returns:
             DataFrame: Only negative comments with sentiment scores
         """
-        # Identify the text column
-        text_col = 'text' if 'text' in comments_df.columns else 'comment'
+        self._add_sentiment_columns(comments_df, text_column)
+        
+        # Filter only negative comments, most negative first; sort_values
+        # already returns a new frame, so no extra copy is needed
+        negative_df = comments_df[comments_df['is_negative']].sort_values(
+            'negative_score', ascending=False
+        )
+        
+        n_negative, n_total = len(negative_df), len(comments_df)
+        print(f"\nFound {n_negative} negative comments out of {n_total} total")
+        print(f"Negative rate: {n_negative/n_total*100:.1f}%")
+        
+        return negative_df
+    
+    def classify_stream(self, chunks, text_column=None):
+        """
+        Classify comments one DataFrame chunk at a time.
+        
+        Useful with pd.read_csv(chunksize=...) so that only one chunk
+        of a large dataset is held in memory at once.
         
-        if text_col not in comments_df.columns:
-            raise ValueError("DataFrame must have 'text' or 'comment' column")
+        Args:
+            chunks: Iterable of DataFrames with 'text' or 'comment' column
+            text_column: Column to classify instead, as in filter_negative_comments()
+            
+        Yields:
+            DataFrame: Each chunk with sentiment columns added
+        """
+        for chunk in chunks:
+            yield self._add_sentiment_columns(chunk, text_column)
+    
+    def _add_sentiment_columns(self, comments_df, text_column=None):
+        """Classify every comment in comments_df and add the score columns in place."""
+        # Identify the text column
+        if text_column is not None:
+            text_col = text_column
+            if text_col not in comments_df.columns:
+                raise ValueError(f"Column '{text_col}' not found in DataFrame")
+        else:
+            text_col = 'text' if 'text' in comments_df.columns else 'comment'
+            
+            if text_col not in comments_df.columns:
+                raise ValueError("DataFrame must have 'text' or 'comment' column")
         
         # Get all texts
         texts = comments_df[text_col].fillna("").tolist()
         
         # Classify
         print(f"Classifying {len(texts)} comments...")
-        results = self.classify_batch(texts)
+        prescreened = None
+        if self.prescreen is not None:
+            negative_scores, prescreened = self.classify_batch(texts, return_prescreened=True)
+        else:
+            negative_scores = self.classify_batch(texts)
+        positive_scores = 1.0 - negative_scores
         
         # Add results to dataframe
-        comments_df['sentiment_label'] = [r['label'] for r in results]
-        comments_df['negative_score'] = [r['negative_score'] for r in results]
-        comments_df['positive_score'] = [r['positive_score'] for r in results]
-        comments_df['is_negative'] = [r['is_negative'] for r in results]
-        
-        # Filter only negative comments
-        negative_df = comments_df[comments_df['is_negative']].copy()
+        comments_df['sentiment_label'] = np.where(
+            negative_scores > positive_scores, "NEGATIVE", "POSITIVE"
+        )
+        comments_df['negative_score'] = negative_scores
+        comments_df['positive_score'] = positive_scores
+        comments_df['is_negative'] = negative_scores >= self.negative_threshold
         
-        # Sort by negative score (most negative first)
-        negative_df = negative_df.sort_values('negative_score', ascending=False)
+        # With the prescreen on, mark the rows scored by VADER rather than the model
+        if prescreened is not None:
+            comments_df['prescreened'] = prescreened
         
-        print(f"\nFound {len(negative_df)} negative comments out of {len(comments_df)} total")
-        print(f"Negative rate: {len(negative_df)/len(comments_df)*100:.1f}%")
-        
-        return negative_df
+        return comments_df
     
     def analyze_negative_comments(self, negative_df):
         """
@@ -152,27 +457,48 @@ class NegativeSentimentClassifier:
         Returns:
             dict: Statistics about negative comments
         """
+        scores = negative_df['negative_score'].to_numpy(dtype=float)
+        
+        # Count mild (<0.6), moderate (0.6-0.8) and high (>=0.8) in one pass
+        mildly, moderately, highly = np.histogram(
+            scores, bins=[-np.inf, 0.6, 0.8, np.inf]
+        )[0]
+        
         stats = {
             'total_negative': len(negative_df),
-            'avg_negative_score': negative_df['negative_score'].mean(),
-            'median_negative_score': negative_df['negative_score'].median(),
-            'highly_negative_count': len(negative_df[negative_df['negative_score'] >= 0.8]),
-            'moderately_negative_count': len(negative_df[
-                (negative_df['negative_score'] >= 0.6) & 
-                (negative_df['negative_score'] < 0.8)
-            ]),
-            'mildly_negative_count': len(negative_df[negative_df['negative_score'] < 0.6])
+            'avg_negative_score': scores.mean() if scores.size else np.nan,
+            'median_negative_score': np.median(scores) if scores.size else np.nan,
+            'highly_negative_count': int(highly),
+            'moderately_negative_count': int(moderately),
+            'mildly_negative_count': int(mildly)
         }
         
         return stats
 
 
+@lru_cache(maxsize=4)
+def get_classifier(config_path="config.yaml"):
+    """
+    Get a shared classifier for a config file.
+    
+    The model is loaded on the first call for each config path and
+    reused afterwards, so it is only deserialized once per process.
+    
+    Args:
+        config_path: Path to the YAML configuration
+        
+    Returns:
+        NegativeSentimentClassifier: Shared classifier instance
+    """
+    return NegativeSentimentClassifier(config_path)
+
+
 def main():
     """Example usage of the negative sentiment classifier."""
     import sys
     
     # Initialize classifier
-    classifier = NegativeSentimentClassifier()
+    classifier = get_classifier()
     
     # Example: Load comments from CSV file
     if len(sys.argv) > 1:
@@ -201,9 +527,7 @@ def main():
     # Get statistics
     stats = classifier.analyze_negative_comments(negative_comments)
     
-    print("\n" + "="*60)
-    print("NEGATIVE COMMENT ANALYSIS")
-    print("="*60)
+    print("\n" + "="*60 + "\nNEGATIVE COMMENT ANALYSIS\n" + "="*60)
     print(f"Total negative comments: {stats['total_negative']}")
     print(f"Average negative score: {stats['avg_negative_score']:.3f}")
     print(f"Median negative score: {stats['median_negative_score']:.3f}")
@@ -220,13 +544,12 @@ def main():
     print(f"\nNegative comments saved to: {output_file}")
     
     # Show top 5 most negative comments
-    print("\n" + "="*60)
-    print("TOP 5 MOST NEGATIVE COMMENTS")
-    print("="*60)
+    print("\n" + "="*60 + "\nTOP 5 MOST NEGATIVE COMMENTS\n" + "="*60)
     text_col = 'text' if 'text' in negative_comments.columns else 'comment'
-    for idx, row in negative_comments.head(5).iterrows():
-        print(f"\nScore: {row['negative_score']:.3f}")
-        print(f"Text: {row[text_col][:200]}...")
+    top = negative_comments.head(5)[['negative_score', text_col]]
+    for score, text in top.itertuples(index=False, name=None):
+        print(f"\nScore: {score:.3f}")
+        print(f"Text: {text[:200]}...")
 
 
 if __name__ == "__main__":
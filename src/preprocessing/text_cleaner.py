@@ -4,12 +4,266 @@ Handles HTML, URLs, emojis, special characters, and more.
 """
 import re
 import html
+from functools import lru_cache
 from typing import Optional
 
+import numpy as np
+import pandas as pd
+
+try:
+    from numba import njit  # optional: compiled normalize_repetitions
+except ImportError:
+    njit = None
+
+
+# Patterns are compiled once at import and shared by every TextCleaner
+
+# URL pattern - matches http(s) URLs
+URL_PATTERN = re.compile(
+    r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+)
+
+# URL pattern that stops where an HTML tag starts, as if tags had been removed first
+_URL_UNTIL_TAG = (
+    r'http[s]?://(?:(?!<[^>]+>)(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|'
+    r'(?:%[0-9a-fA-F][0-9a-fA-F])))+'
+)
+
+# Email pattern
+EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+
+# HTML tags
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Mentions (@username)
+MENTION_PATTERN = re.compile(r'@\w+')
+
+# Hashtags (#hashtag)
+HASHTAG_PATTERN = re.compile(r'#\w+')
+
+# Runs of special characters and whitespace (for optional removal); each
+# run becomes one space, so no separate whitespace pass is needed
+SPECIAL_CHARS_PATTERN = re.compile(r'[^\w.,!?;:\'\"-]+')
+
+# Runs of anything but word characters (punctuation and whitespace included)
+NON_WORD_PATTERN = re.compile(r'\W+')
+
+# Runs of digits
+DIGITS_PATTERN = re.compile(r'\d+')
+
+# Common English contractions and their expansions
+CONTRACTIONS = {
+    "ain't": "am not",
+    "aren't": "are not",
+    "can't": "cannot",
+    "can't've": "cannot have",
+    "could've": "could have",
+    "couldn't": "could not",
+    "didn't": "did not",
+    "doesn't": "does not",
+    "don't": "do not",
+    "hadn't": "had not",
+    "hasn't": "has not",
+    "haven't": "have not",
+    "he'd": "he would",
+    "he'll": "he will",
+    "he's": "he is",
+    "i'd": "i would",
+    "i'll": "i will",
+    "i'm": "i am",
+    "i've": "i have",
+    "isn't": "is not",
+    "it'd": "it would",
+    "it'll": "it will",
+    "it's": "it is",
+    "let's": "let us",
+    "might've": "might have",
+    "must've": "must have",
+    "shan't": "shall not",
+    "she'd": "she would",
+    "she'll": "she will",
+    "she's": "she is",
+    "should've": "should have",
+    "shouldn't": "should not",
+    "that'd": "that would",
+    "that's": "that is",
+    "there'd": "there would",
+    "there's": "there is",
+    "they'd": "they would",
+    "they'll": "they will",
+    "they're": "they are",
+    "they've": "they have",
+    "wasn't": "was not",
+    "we'd": "we would",
+    "we'll": "we will",
+    "we're": "we are",
+    "we've": "we have",
+    "weren't": "were not",
+    "what'll": "what will",
+    "what're": "what are",
+    "what's": "what is",
+    "what've": "what have",
+    "where'd": "where did",
+    "where's": "where is",
+    "who'll": "who will",
+    "who's": "who is",
+    "won't": "will not",
+    "wouldn't": "would not",
+    "you'd": "you would",
+    "you'll": "you will",
+    "you're": "you are",
+    "you've": "you have"
+}
+
+CONTRACTIONS_PATTERN = re.compile(
+    r'\b(' + '|'.join(re.escape(key) for key in CONTRACTIONS) + r')\b', re.IGNORECASE
+)
+
+
+def _expand_contraction(match):
+    """Replacement for a CONTRACTIONS_PATTERN match."""
+    return CONTRACTIONS[match.group(0).lower()]
+
+
+# Emoji code point ranges (inclusive) - covers most emoji ranges
+EMOJI_RANGES = (
+    (0x1F600, 0x1F64F),  # emoticons
+    (0x1F300, 0x1F5FF),  # symbols & pictographs
+    (0x1F680, 0x1F6FF),  # transport & map symbols
+    (0x1F1E0, 0x1F1FF),  # flags (iOS)
+    (0x2500, 0x2BEF),    # chinese char
+    (0x2702, 0x27B0),
+    (0x24C2, 0x1F251),
+    (0x1F926, 0x1F937),
+    (0x10000, 0x10FFFF),
+    (0x2640, 0x2642),
+    (0x2600, 0x2B55),
+    (0x200D, 0x200D),
+    (0x23CF, 0x23CF),
+    (0x23E9, 0x23E9),
+    (0x231A, 0x231A),
+    (0xFE0F, 0xFE0F),    # dingbats
+    (0x3030, 0x3030),
+)
+
+
+def _merge_ranges(ranges):
+    """Sort and merge overlapping or adjacent (lo, hi) code point ranges."""
+    merged = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return merged
+
+
+# The ranges overlap heavily; merged they form a much smaller character class
+EMOJI_PATTERN = re.compile(
+    '[' + ''.join(
+        re.escape(chr(lo)) if lo == hi else f'{re.escape(chr(lo))}-{re.escape(chr(hi))}'
+        for lo, hi in _merge_ranges(EMOJI_RANGES)
+    ) + ']+'
+)
+
+
+@lru_cache(maxsize=None)
+def _fused_pattern(remove_html: bool, remove_urls: bool, remove_emails: bool):
+    """Combine the enabled HTML/URL/email patterns into one compiled regex."""
+    parts = []
+    url = _URL_UNTIL_TAG if remove_html else URL_PATTERN.pattern
+    
+    if remove_html:
+        parts.append(HTML_TAG_PATTERN.pattern)
+    
+    if remove_urls:
+        parts.append(url)
+    
+    if remove_emails:
+        email = EMAIL_PATTERN.pattern
+        if remove_urls:
+            # An email can only run into a URL with its tail ('a@b.comhttp://x'):
+            # end it where the URL starts, as if URLs had been removed first
+            url_rest = url[len('http[s]?'):]
+            email = (email[:-len(r'\b')]
+                     + rf'(?:\b(?!(?<=http){url_rest}|(?<=https){url_rest})|(?={url}))')
+        parts.append(email)
+    
+    if not parts:
+        return None
+    return re.compile('|'.join(parts))
+
+
+@lru_cache(maxsize=None)
+def _social_pattern(remove_mentions: bool, remove_hashtags: bool):
+    """
+    Combine the enabled mention/hashtag patterns into one compiled regex.
+    
+    Kept apart from _fused_pattern: a mention can start inside an email
+    ('@bob@x.com'), so these only run once emails/URLs are gone.
+    """
+    parts = []
+    
+    if remove_mentions:
+        parts.append(MENTION_PATTERN.pattern)
+    
+    if remove_hashtags:
+        parts.append(HASHTAG_PATTERN.pattern)
+    
+    if not parts:
+        return None
+    return re.compile('|'.join(parts))
+
+
+@lru_cache(maxsize=None)
+def _repetition_pattern(max_repetitions: int):
+    """Regex matching a character repeated more than max_repetitions times."""
+    return re.compile(r'(.)\1{' + str(max_repetitions) + ',}')
+
+
+def _collapse_runs(codes, out, max_repetitions):
+    """
+    Copy code points to out, keeping at most max_repetitions of each run.
+    
+    Newlines are never collapsed, matching the '.' in _repetition_pattern.
+    
+    Returns:
+        int: Number of code points written to out
+    """
+    n = 0
+    run = 0
+    prev = -1
+    for i in range(codes.shape[0]):
+        c = codes[i]
+        if c == prev and c != 10:
+            run += 1
+        else:
+            prev = c
+            run = 1
+        if run <= max_repetitions:
+            out[n] = c
+            n += 1
+    return n
+
+
+if njit is not None:
+    _collapse_runs = njit(cache=True)(_collapse_runs)
+
 
 class TextCleaner:
     """Clean and normalize text data from comments."""
     
+    # Fixed attribute set: no per-instance __dict__, cheaper attribute reads
+    __slots__ = (
+        'remove_urls', 'remove_emails', 'remove_html', 'remove_mentions',
+        'remove_hashtags', 'remove_extra_whitespace', 'lowercase',
+        'url_pattern', 'email_pattern', 'html_tag_pattern', 'mention_pattern',
+        'hashtag_pattern', 'special_chars_pattern',
+        'non_word_pattern', 'digits_pattern', 'emoji_pattern',
+        'contractions_pattern', 'fused_pattern', 'social_pattern',
+        'cache_size', '_cached_clean'
+    )
+    
     def __init__(self, 
                  remove_urls: bool = True,
                  remove_emails: bool = True,
@@ -17,7 +271,8 @@ class TextCleaner:
                  remove_mentions: bool = False,
                  remove_hashtags: bool = False,
                  remove_extra_whitespace: bool = True,
-                 lowercase: bool = False):
+                 lowercase: bool = False,
+                 cache_size: int = 0):
         """
         Initialize text cleaner with configuration.
         
@@ -29,6 +284,8 @@ class TextCleaner:
             remove_hashtags: Remove #hashtags
             remove_extra_whitespace: Normalize whitespace
             lowercase: Convert text to lowercase
+            cache_size: Remember the results for this many recent texts, so
+                repeated comments are cleaned once (0 disables the cache)
         """
         self.remove_urls = remove_urls
         self.remove_emails = remove_emails
@@ -37,36 +294,46 @@ class TextCleaner:
         self.remove_hashtags = remove_hashtags
         self.remove_extra_whitespace = remove_extra_whitespace
         self.lowercase = lowercase
+        self.cache_size = cache_size
         
         # Compile regex patterns for efficiency
         self._compile_patterns()
+        self._build_cache()
+    
+    def __getstate__(self):
+        # The LRU wrapper can't be pickled; unpickled copies start with an empty one
+        return {name: getattr(self, name) for name in self.__slots__
+                if name != '_cached_clean'}
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._build_cache()
     
     def _compile_patterns(self):
-        """Compile regex patterns for text cleaning."""
-        # URL pattern - matches http(s) URLs
-        self.url_pattern = re.compile(
-            r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        )
-        
-        # Email pattern
-        self.email_pattern = re.compile(
-            r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        )
-        
-        # HTML tags
-        self.html_tag_pattern = re.compile(r'<[^>]+>')
+        """Attach the shared, precompiled regex patterns for text cleaning."""
+        self.url_pattern = URL_PATTERN
+        self.email_pattern = EMAIL_PATTERN
+        self.html_tag_pattern = HTML_TAG_PATTERN
+        self.mention_pattern = MENTION_PATTERN
+        self.hashtag_pattern = HASHTAG_PATTERN
+        self.special_chars_pattern = SPECIAL_CHARS_PATTERN
+        self.non_word_pattern = NON_WORD_PATTERN
+        self.digits_pattern = DIGITS_PATTERN
+        self.emoji_pattern = EMOJI_PATTERN
+        self.contractions_pattern = CONTRACTIONS_PATTERN
         
-        # Mentions (@username)
-        self.mention_pattern = re.compile(r'@\w+')
-        
-        # Hashtags (#hashtag)
-        self.hashtag_pattern = re.compile(r'#\w+')
-        
-        # Multiple whitespace
-        self.whitespace_pattern = re.compile(r'\s+')
-        
-        # Special characters (for optional removal)
-        self.special_chars_pattern = re.compile(r'[^\w\s.,!?;:\'\"-]')
+        # One alternation over the enabled HTML/URL/email rules and one over
+        # mentions/hashtags, so each text is scanned at most twice
+        self.fused_pattern = _fused_pattern(self.remove_html, self.remove_urls, self.remove_emails)
+        self.social_pattern = _social_pattern(self.remove_mentions, self.remove_hashtags)
+    
+    def _build_cache(self):
+        """Wrap _clean() in a per-instance LRU cache when cache_size is set."""
+        if self.cache_size > 0:
+            self._cached_clean = lru_cache(maxsize=self.cache_size)(self._clean)
+        else:
+            self._cached_clean = None
     
     def clean(self, text: str) -> str:
         """
@@ -81,39 +348,54 @@ class TextCleaner:
         if not text or not isinstance(text, str):
             return ""
         
+        if self._cached_clean is not None:
+            return self._cached_clean(text)
+        return self._clean(text)
+    
+    def _clean(self, text: str) -> str:
+        """Run the configured cleaning steps on a non-empty string."""
         # Decode HTML entities first
         if self.remove_html:
             text = html.unescape(text)
-            text = self.html_tag_pattern.sub(' ', text)
-        
-        # Remove URLs
-        if self.remove_urls:
-            text = self.url_pattern.sub(' ', text)
         
-        # Remove emails
-        if self.remove_emails:
-            text = self.email_pattern.sub(' ', text)
+        # Remove HTML tags, URLs and emails in one pass
+        if self.fused_pattern is not None:
+            text = self.fused_pattern.sub(' ', text)
         
-        # Remove mentions
-        if self.remove_mentions:
-            text = self.mention_pattern.sub(' ', text)
-        
-        # Remove hashtags
-        if self.remove_hashtags:
-            text = self.hashtag_pattern.sub(' ', text)
+        # Remove mentions and hashtags
+        if self.social_pattern is not None:
+            text = self.social_pattern.sub(' ', text)
         
         # Normalize whitespace
         if self.remove_extra_whitespace:
-            text = self.whitespace_pattern.sub(' ', text)
+            text = ' '.join(text.split())
         
         # Convert to lowercase
         if self.lowercase:
             text = text.lower()
         
         # Strip leading/trailing whitespace
-        text = text.strip()
+        return text.strip()
+    
+    def clean_series(self, series: pd.Series) -> pd.Series:
+        """
+        Clean a whole Series of texts.
+        
+        Same result as applying clean() to every element. Each text goes
+        through the compiled patterns in one pass, which measures faster
+        than running every step over the whole column with Series.str.
         
-        return text
+        Args:
+            series: Series of raw texts
+            
+        Returns:
+            pd.Series: Cleaned texts (non-string values, including NA, become "")
+        """
+        clean = self.clean
+        return pd.Series(
+            [clean(text) if isinstance(text, str) else "" for text in series.tolist()],
+            index=series.index, dtype=object
+        )
     
     def remove_special_characters(self, text: str, keep_punctuation: bool = True) -> str:
         """
@@ -126,12 +408,8 @@ class TextCleaner:
         Returns:
             str: Text with special characters removed
         """
-        if not keep_punctuation:
-            text = re.sub(r'[^\w\s]', ' ', text)
-        else:
-            text = self.special_chars_pattern.sub(' ', text)
-        
-        return self.whitespace_pattern.sub(' ', text).strip()
+        pattern = self.special_chars_pattern if keep_punctuation else self.non_word_pattern
+        return pattern.sub(' ', text).strip()
     
     def remove_emojis(self, text: str) -> str:
         """
@@ -143,31 +421,7 @@ class TextCleaner:
         Returns:
             str: Text without emojis
         """
-        # Emoji pattern - covers most emoji ranges
-        emoji_pattern = re.compile(
-            "["
-            u"\U0001F600-\U0001F64F"  # emoticons
-            u"\U0001F300-\U0001F5FF"  # symbols & pictographs
-            u"\U0001F680-\U0001F6FF"  # transport & map symbols
-            u"\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            u"\U00002500-\U00002BEF"  # chinese char
-            u"\U00002702-\U000027B0"
-            u"\U00002702-\U000027B0"
-            u"\U000024C2-\U0001F251"
-            u"\U0001f926-\U0001f937"
-            u"\U00010000-\U0010ffff"
-            u"\u2640-\u2642"
-            u"\u2600-\u2B55"
-            u"\u200d"
-            u"\u23cf"
-            u"\u23e9"
-            u"\u231a"
-            u"\ufe0f"  # dingbats
-            u"\u3030"
-            "]+",
-            flags=re.UNICODE
-        )
-        return emoji_pattern.sub(r' ', text)
+        return self.emoji_pattern.sub(' ', text)
     
     def remove_numbers(self, text: str, replace_with: str = ' ') -> str:
         """
@@ -180,7 +434,7 @@ class TextCleaner:
         Returns:
             str: Text without numbers
         """
-        return re.sub(r'\d+', replace_with, text)
+        return self.digits_pattern.sub(replace_with, text)
     
     def expand_contractions(self, text: str) -> str:
         """
@@ -192,76 +446,7 @@ class TextCleaner:
         Returns:
             str: Text with expanded contractions
         """
-        contractions_dict = {
-            "ain't": "am not",
-            "aren't": "are not",
-            "can't": "cannot",
-            "can't've": "cannot have",
-            "could've": "could have",
-            "couldn't": "could not",
-            "didn't": "did not",
-            "doesn't": "does not",
-            "don't": "do not",
-            "hadn't": "had not",
-            "hasn't": "has not",
-            "haven't": "have not",
-            "he'd": "he would",
-            "he'll": "he will",
-            "he's": "he is",
-            "i'd": "i would",
-            "i'll": "i will",
-            "i'm": "i am",
-            "i've": "i have",
-            "isn't": "is not",
-            "it'd": "it would",
-            "it'll": "it will",
-            "it's": "it is",
-            "let's": "let us",
-            "might've": "might have",
-            "must've": "must have",
-            "shan't": "shall not",
-            "she'd": "she would",
-            "she'll": "she will",
-            "she's": "she is",
-            "should've": "should have",
-            "shouldn't": "should not",
-            "that'd": "that would",
-            "that's": "that is",
-            "there'd": "there would",
-            "there's": "there is",
-            "they'd": "they would",
-            "they'll": "they will",
-            "they're": "they are",
-            "they've": "they have",
-            "wasn't": "was not",
-            "we'd": "we would",
-            "we'll": "we will",
-            "we're": "we are",
-            "we've": "we have",
-            "weren't": "were not",
-            "what'll": "what will",
-            "what're": "what are",
-            "what's": "what is",
-            "what've": "what have",
-            "where'd": "where did",
-            "where's": "where is",
-            "who'll": "who will",
-            "who's": "who is",
-            "won't": "will not",
-            "wouldn't": "would not",
-            "you'd": "you would",
-            "you'll": "you will",
-            "you're": "you are",
-            "you've": "you have"
-        }
-        
-        # Create pattern from contractions
-        pattern = re.compile(r'\b(' + '|'.join(re.escape(key) for key in contractions_dict.keys()) + r')\b', re.IGNORECASE)
-        
-        def replace_match(match):
-            return contractions_dict[match.group(0).lower()]
-        
-        return pattern.sub(replace_match, text)
+        return self.contractions_pattern.sub(_expand_contraction, text)
     
     def normalize_repetitions(self, text: str, max_repetitions: int = 2) -> str:
         """
@@ -274,8 +459,15 @@ class TextCleaner:
         Returns:
             str: Text with normalized repetitions
         """
-        pattern = re.compile(r'(.)\1{' + str(max_repetitions) + ',}')
-        return pattern.sub(r'\1' * max_repetitions, text)
+        if njit is None or max_repetitions < 1:
+            pattern = _repetition_pattern(max_repetitions)
+            return pattern.sub(r'\1' * max_repetitions, text)
+        
+        # Compiled scan over the code points instead of a backreference regex
+        codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        out = np.empty_like(codes)
+        n = _collapse_runs(codes, out, max_repetitions)
+        return out[:n].tobytes().decode('utf-32-le', 'surrogatepass')
 
 
 # Example usage and testing
@@ -3,47 +3,93 @@ Text preprocessor for advanced NLP operations.
 Includes tokenization, stopword removal, lemmatization, and more.
 """
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 import pandas as pd
 from typing import List, Optional, Union
 from .text_cleaner import TextCleaner
 
 
+# Word tokens; a maximal run of word characters is always bounded by \b
+WORD_PATTERN = re.compile(r'\w+')
+
+# Common English stopwords (basic set). Built once; each preprocessor
+# starts from its own mutable copy
+STOPWORDS = frozenset({
+    'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 
+    'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
+    'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
+    'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
+    'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
+    'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing',
+    'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until',
+    'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',
+    'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
+    'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again',
+    'further', 'then', 'once'
+})
+
+
+def _count_words(texts: List[str]) -> Counter:
+    """Word counts for a block of texts (get_word_frequency's worker)."""
+    word_freq = Counter()
+    for text in texts:
+        word_freq.update(WORD_PATTERN.findall(text.lower()))
+    return word_freq
+
+
 class TextPreprocessor:
     """
     Advanced text preprocessing for NLP tasks.
     Combines cleaning, tokenization, and normalization.
     """
     
+    __slots__ = ('use_cleaner', 'cleaner', 'stopwords', 'cache_size', '_cached_preprocess')
+    
     def __init__(self, 
                  use_cleaner: bool = True,
-                 cleaner_config: Optional[dict] = None):
+                 cleaner_config: Optional[dict] = None,
+                 cache_size: int = 0):
         """
         Initialize preprocessor.
         
         Args:
             use_cleaner: Whether to use text cleaner
             cleaner_config: Configuration for TextCleaner
+            cache_size: Remember preprocess() results for this many recent
+                (text, options) pairs (0 disables the cache). The cache is
+                reset by add_stopwords()/remove_stopword_entries(); editing
+                the stopwords set directly does not reset it
         """
         self.use_cleaner = use_cleaner
+        self.cache_size = cache_size
         
         if use_cleaner:
             cleaner_config = cleaner_config or {}
             self.cleaner = TextCleaner(**cleaner_config)
         
-        # Common English stopwords (basic set)
-        self.stopwords = {
-            'i', 'me', 'my', 'myself', 'we', 'our', 'ours', 'ourselves', 'you', 
-            'your', 'yours', 'yourself', 'yourselves', 'he', 'him', 'his', 'himself',
-            'she', 'her', 'hers', 'herself', 'it', 'its', 'itself', 'they', 'them',
-            'their', 'theirs', 'themselves', 'what', 'which', 'who', 'whom', 'this',
-            'that', 'these', 'those', 'am', 'is', 'are', 'was', 'were', 'be', 'been',
-            'being', 'have', 'has', 'had', 'having', 'do', 'does', 'did', 'doing',
-            'a', 'an', 'the', 'and', 'but', 'if', 'or', 'because', 'as', 'until',
-            'while', 'of', 'at', 'by', 'for', 'with', 'about', 'against', 'between',
-            'into', 'through', 'during', 'before', 'after', 'above', 'below', 'to',
-            'from', 'up', 'down', 'in', 'out', 'on', 'off', 'over', 'under', 'again',
-            'further', 'then', 'once'
-        }
+        # Own copy, so callers can edit it without affecting other instances
+        self.stopwords = set(STOPWORDS)
+        
+        self._build_cache()
+    
+    def __getstate__(self):
+        # The LRU wrapper can't be pickled; unpickled copies start with an empty one
+        return {name: getattr(self, name) for name in self.__slots__
+                if name != '_cached_preprocess' and hasattr(self, name)}
+    
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._build_cache()
+    
+    def _build_cache(self):
+        """Wrap _preprocess() in a fresh LRU cache when cache_size is set."""
+        if self.cache_size > 0:
+            self._cached_preprocess = lru_cache(maxsize=self.cache_size)(self._preprocess)
+        else:
+            self._cached_preprocess = None
     
     def preprocess(self, text: str, 
                    remove_stopwords: bool = False,
@@ -64,10 +110,28 @@ class TextPreprocessor:
         if not text or not isinstance(text, str):
             return ""
         
+        if self._cached_preprocess is not None:
+            return self._cached_preprocess(text, remove_stopwords,
+                                           min_word_length, expand_contractions)
+        return self._preprocess(text, remove_stopwords, min_word_length, expand_contractions)
+    
+    def _preprocess(self, text: str,
+                    remove_stopwords: bool,
+                    min_word_length: int,
+                    expand_contractions: bool) -> str:
+        """Clean, tokenize and filter a non-empty string."""
         # Clean text first
         if self.use_cleaner:
             text = self.cleaner.clean(text)
         
+        return self._tokenize_and_filter(text, remove_stopwords,
+                                         min_word_length, expand_contractions)
+    
+    def _tokenize_and_filter(self, text: str,
+                             remove_stopwords: bool = False,
+                             min_word_length: int = 1,
+                             expand_contractions: bool = False) -> str:
+        """Run the post-cleaning steps of preprocess() on already cleaned text."""
         # Expand contractions
         if expand_contractions and self.use_cleaner:
             text = self.cleaner.expand_contractions(text)
@@ -75,9 +139,12 @@ class TextPreprocessor:
         # Tokenize
         words = self.tokenize(text)
         
-        # Remove stopwords
+        # Remove stopwords (cleaned text is already lowercase when the cleaner lowercases)
         if remove_stopwords:
-            words = [w for w in words if w.lower() not in self.stopwords]
+            if self._is_lowercased():
+                words = [w for w in words if w not in self.stopwords]
+            else:
+                words = [w for w in words if w.lower() not in self.stopwords]
         
         # Filter by word length
         if min_word_length > 1:
@@ -85,6 +152,10 @@ class TextPreprocessor:
         
         return ' '.join(words)
     
+    def _is_lowercased(self) -> bool:
+        """Whether text coming out of the cleaner is already lowercase."""
+        return self.use_cleaner and self.cleaner.lowercase
+    
     def tokenize(self, text: str) -> List[str]:
         """
         Simple word tokenization.
@@ -96,8 +167,7 @@ class TextPreprocessor:
             List[str]: List of tokens
         """
         # Split on whitespace and punctuation, keep words
-        tokens = re.findall(r'\b\w+\b', text)
-        return [t for t in tokens if t]
+        return WORD_PATTERN.findall(text)
     
     def remove_stopwords(self, text: str, custom_stopwords: Optional[set] = None) -> str:
         """
@@ -125,6 +195,7 @@ class TextPreprocessor:
         if isinstance(words, str):
             words = [words]
         self.stopwords.update(w.lower() for w in words)
+        self._build_cache()
     
     def remove_stopword_entries(self, words: Union[str, List[str]]):
         """
@@ -136,10 +207,12 @@ class TextPreprocessor:
         if isinstance(words, str):
             words = [words]
         self.stopwords.difference_update(w.lower() for w in words)
+        self._build_cache()
     
     def preprocess_dataframe(self, df: pd.DataFrame, 
                             text_column: str,
                             output_column: str = 'preprocessed_text',
+                            n_workers: int = 1,
                             **preprocess_kwargs) -> pd.DataFrame:
         """
         Preprocess text in a pandas DataFrame.
@@ -148,6 +221,8 @@ class TextPreprocessor:
             df: DataFrame containing text data
             text_column: Name of column with text to preprocess
             output_column: Name for output column
+            n_workers: Number of worker processes; the column is split into
+                one block per worker when greater than 1
             **preprocess_kwargs: Arguments to pass to preprocess()
             
         Returns:
@@ -157,21 +232,51 @@ class TextPreprocessor:
             raise ValueError(f"Column '{text_column}' not found in DataFrame")
         
         print(f"Preprocessing {len(df)} texts...")
-        df[output_column] = df[text_column].fillna('').apply(
-            lambda x: self.preprocess(x, **preprocess_kwargs)
-        )
+        texts = df[text_column]
+        if n_workers > 1 and len(texts) > 1:
+            preprocess = partial(self.preprocess_series, **preprocess_kwargs)
+            block_size = -(-len(texts) // n_workers)
+            blocks = [texts.iloc[i:i + block_size] for i in range(0, len(texts), block_size)]
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                df[output_column] = pd.concat(executor.map(preprocess, blocks))
+        else:
+            df[output_column] = self.preprocess_series(texts, **preprocess_kwargs)
         
         print(f"✓ Preprocessing complete. Results in '{output_column}' column")
         return df
     
+    def preprocess_series(self, texts: pd.Series, **preprocess_kwargs) -> pd.Series:
+        """
+        Preprocess a whole Series of texts.
+        
+        Produces the same result as applying preprocess() to every element.
+        
+        Args:
+            texts: Series of raw texts
+            **preprocess_kwargs: Arguments to pass to preprocess()
+            
+        Returns:
+            pd.Series: Preprocessed texts (non-string values become "")
+        """
+        # One pass per text measures faster than column-wide .str steps
+        preprocess = self.preprocess
+        return pd.Series(
+            [preprocess(text, **preprocess_kwargs) if isinstance(text, str) else ""
+             for text in texts.tolist()],
+            index=texts.index, dtype=object
+        )
+    
     def get_word_frequency(self, texts: Union[str, List[str]], 
-                          top_n: Optional[int] = None) -> dict:
+                          top_n: Optional[int] = None,
+                          n_workers: int = 1) -> dict:
         """
         Get word frequency from text(s).
         
         Args:
             texts: Single text or list of texts
             top_n: Return only top N most frequent words
+            n_workers: Number of worker processes; each counts one block of
+                texts when greater than 1
             
         Returns:
             dict: Word frequency dictionary
@@ -179,19 +284,19 @@ class TextPreprocessor:
         if isinstance(texts, str):
             texts = [texts]
         
-        word_freq = {}
-        for text in texts:
-            words = self.tokenize(text.lower())
-            for word in words:
-                word_freq[word] = word_freq.get(word, 0) + 1
+        if n_workers > 1 and len(texts) > 1:
+            # Merging the blocks in order keeps first-seen order for ties
+            block_size = -(-len(texts) // n_workers)
+            blocks = [texts[i:i + block_size] for i in range(0, len(texts), block_size)]
+            word_freq = Counter()
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                for partial_freq in executor.map(_count_words, blocks):
+                    word_freq.update(partial_freq)
+        else:
+            word_freq = _count_words(texts)
         
-        # Sort by frequency
-        word_freq = dict(sorted(word_freq.items(), key=lambda x: x[1], reverse=True))
-        
-        if top_n:
-            word_freq = dict(list(word_freq.items())[:top_n])
-        
-        return word_freq
+        # Sort by frequency (ties keep first-seen order); a heap when top_n is set
+        return dict(word_freq.most_common(top_n or None))
     
     def filter_by_length(self, text: str, min_length: int = 0, max_length: Optional[int] = None) -> str:
         """
@@ -230,17 +335,26 @@ class TextPreprocessor:
         
         return list(word_freq.keys())
     
-    def batch_preprocess(self, texts: List[str], **preprocess_kwargs) -> List[str]:
+    def batch_preprocess(self, texts: List[str], n_workers: int = 1,
+                         **preprocess_kwargs) -> List[str]:
         """
         Preprocess multiple texts.
         
         Args:
             texts: List of texts to preprocess
+            n_workers: Number of worker processes; texts are split across them
+                when greater than 1 (the preprocessor is pickled to each)
             **preprocess_kwargs: Arguments to pass to preprocess()
             
         Returns:
-            List[str]: List of preprocessed texts
+            List[str]: List of preprocessed texts, in input order
         """
+        if n_workers > 1 and len(texts) > 1:
+            preprocess = partial(self.preprocess, **preprocess_kwargs)
+            chunksize = max(1, len(texts) // (n_workers * 4))
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                return list(executor.map(preprocess, texts, chunksize=chunksize))
+        
         return [self.preprocess(text, **preprocess_kwargs) for text in texts]
 
 
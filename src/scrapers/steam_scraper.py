@@ -3,15 +3,78 @@ Simple Steam Review Scraper
 Direct API calls to Steam - faster and no rate limit issues for small batches
 """
 
+import csv
 import requests
+from requests.adapters import HTTPAdapter
 import pandas as pd
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import itemgetter
 import time
 
+try:
+    from orjson import loads as json_loads  # optional: faster JSON decoding
+except ImportError:
+    from json import loads as json_loads
+
+# Seconds a cached review page is reused
+CACHE_TTL = 24 * 3600
+
 class SteamScraperSimple:
-    def __init__(self):
-        """Initialize simple Steam scraper"""
+    # Column order of the saved reviews
+    _COLUMNS = [
+        'review_id', 'app_id', 'author_steamid', 'author_playtime_hours', 'text',
+        'timestamp_created', 'voted_up', 'votes_up', 'votes_funny', 'comment_count',
+        'steam_purchase', 'language', 'scraped_at'
+    ]
+    
+    # Known dtypes, so pandas doesn't infer them row by row
+    _DTYPES = {
+        'author_playtime_hours': 'float64',
+        'voted_up': 'bool',
+        'votes_up': 'int32',
+        'votes_funny': 'int32',
+        'comment_count': 'int32',
+        'steam_purchase': 'bool',
+        'language': 'category'
+    }
+    
+    def __init__(self, cache_dir=None):
+        """
+        Initialize simple Steam scraper
+        
+        Args:
+            cache_dir (str): Keep review pages in an on-disk cache here
+                (needs diskcache); None disables caching
+        """
         self.base_url = "https://store.steampowered.com/appreviews/"
+        
+        self.cache = None
+        if cache_dir is not None:
+            from diskcache import Cache
+            self.cache = Cache(cache_dir)
+        
+        # One keep-alive session so repeated calls reuse the TCP/TLS connection
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': 'comment-analyzer/1.0'
+        })
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=3)
+        self.session.mount('https://', adapter)
+    
+    def close(self):
+        """Close the HTTP session and the page cache"""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def scrape_reviews(self, app_id, max_reviews=20):
         """
@@ -22,7 +85,7 @@ class SteamScraperSimple:
             max_reviews (int): Maximum number of reviews to fetch
             
         Returns:
-            list: List of review dictionaries
+            list: List of review dictionaries, keyed by _COLUMNS
         """
         reviews = []
         
@@ -33,54 +96,62 @@ class SteamScraperSimple:
             'json': 1,
             'filter': 'recent',
             'language': 'english',
-            'num_per_page': min(max_reviews, 100),  # Max 100 per request
-            'purchase_type': 'all'
+            'purchase_type': 'all',
+            'cursor': '*'  # First page; each response returns the next cursor
         }
         
         try:
             url = f"{self.base_url}{app_id}"
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code != 200:
-                print(f"Error: HTTP {response.status_code}")
-                return []
-            
-            data = response.json()
-            
-            if not data.get('success'):
-                print("Failed to fetch reviews")
-                return []
-            
-            review_list = data.get('reviews', [])
-            
-            if not review_list:
-                print("No reviews found")
-                return []
             
-            print(f"Processing {len(review_list)} reviews...")
-            
-            for review_data in review_list[:max_reviews]:
-                # Convert playtime
-                playtime_hours = round(review_data.get('author', {}).get('playtime_forever', 0) / 60, 1)
+            # Pages are chained by cursor, so they are fetched in order
+            while len(reviews) < max_reviews:
+                params['num_per_page'] = min(max_reviews - len(reviews), 100)  # Max 100 per request
+                data = self._fetch_page(url, params)
+                
+                if data is None:
+                    break
+                
+                if not data.get('success'):
+                    print("Failed to fetch reviews")
+                    break
+                
+                review_list = data.get('reviews', [])
+                
+                if not review_list:
+                    if not reviews:
+                        print("No reviews found")
+                    break
                 
-                review = {
-                    'review_id': review_data.get('recommendationid', ''),
-                    'app_id': app_id,
-                    'author_steamid': review_data.get('author', {}).get('steamid', ''),
-                    'author_playtime_hours': playtime_hours,
-                    'text': review_data.get('review', ''),
-                    'timestamp_created': datetime.fromtimestamp(
-                        review_data.get('timestamp_created', 0)
-                    ).isoformat(),
-                    'voted_up': review_data.get('voted_up', False),
-                    'votes_up': review_data.get('votes_up', 0),
-                    'votes_funny': review_data.get('votes_funny', 0),
-                    'comment_count': review_data.get('comment_count', 0),
-                    'steam_purchase': review_data.get('steam_purchase', False),
-                    'language': review_data.get('language', ''),
-                    'scraped_at': datetime.now().isoformat()
-                }
-                reviews.append(review)
+                print(f"Processing {len(review_list)} reviews...")
+                scraped_at = datetime.now().isoformat()
+                
+                for review_data in review_list[:max_reviews - len(reviews)]:
+                    get = review_data.get
+                    author = get('author') or {}
+                    
+                    reviews.append({
+                        'review_id': get('recommendationid', ''),
+                        'app_id': app_id,
+                        'author_steamid': author.get('steamid', ''),
+                        'author_playtime_hours': round(author.get('playtime_forever', 0) / 60, 1),
+                        'text': get('review', ''),
+                        'timestamp_created': datetime.fromtimestamp(
+                            get('timestamp_created', 0)
+                        ).isoformat(),
+                        'voted_up': get('voted_up', False),
+                        'votes_up': get('votes_up', 0),
+                        'votes_funny': get('votes_funny', 0),
+                        'comment_count': get('comment_count', 0),
+                        'steam_purchase': get('steam_purchase', False),
+                        'language': get('language', ''),
+                        'scraped_at': scraped_at
+                    })
+                
+                # Stop when Steam has no further page
+                cursor = data.get('cursor')
+                if not cursor or cursor == params['cursor']:
+                    break
+                params['cursor'] = cursor
             
             print(f"✅ Successfully scraped {len(reviews)} reviews")
             
@@ -93,21 +164,79 @@ class SteamScraperSimple:
         
         return reviews
     
-    def save_to_csv(self, reviews, filename='steam_reviews.csv'):
+    def _fetch_page(self, url, params):
+        """
+        Fetch one page of reviews, from the on-disk cache when enabled
+        
+        Returns:
+            dict: Decoded response, or None on an HTTP error
+        """
+        cache_key = (url, tuple(sorted(params.items())))
+        if self.cache is not None:
+            data = self.cache.get(cache_key)
+            if data is not None:
+                return data
+        
+        response = self.session.get(url, params=params, timeout=10)
+        
+        if response.status_code != 200:
+            print(f"Error: HTTP {response.status_code}")
+            return None
+        
+        data = json_loads(response.content)
+        if self.cache is not None and data.get('success'):
+            self.cache.set(cache_key, data, expire=CACHE_TTL)
+        return data
+    
+    def scrape_multiple_games(self, app_ids, max_reviews_per_game=20, max_workers=4):
+        """
+        Scrape reviews from multiple games concurrently
+        
+        Each game's pages are fetched in order; different games are
+        fetched in parallel threads sharing the session's connection pool.
+        
+        Args:
+            app_ids (list): List of Steam App IDs
+            max_reviews_per_game (int): Max reviews per game
+            max_workers (int): Number of games scraped at once
+            
+        Returns:
+            list: Combined list of all reviews, in app_ids order; a game
+                listed more than once is scraped once
+        """
+        app_ids = list(dict.fromkeys(app_ids))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda app_id: self.scrape_reviews(app_id, max_reviews_per_game), app_ids
+            )
+            return list(chain.from_iterable(results))
+    
+    def save_to_csv(self, reviews, filename='steam_reviews.csv', use_pandas=False):
         """
         Save reviews to CSV file
         
         Args:
-            reviews (list): List of review dictionaries
+            reviews (list): Review dictionaries from scrape_reviews()
             filename (str): Output filename
+            use_pandas (bool): Build a typed DataFrame and write it with pandas;
+                by default rows are streamed straight to the file with csv.writer,
+                which writes the same CSV without a second in-memory copy
         """
         if not reviews:
             print("No reviews to save")
             return None
         
-        df = pd.DataFrame(reviews)
         output_path = f'data/raw/{filename}'
-        df.to_csv(output_path, index=False, encoding='utf-8')
+        if use_pandas:
+            df = pd.DataFrame(reviews, columns=self._COLUMNS).astype(self._DTYPES)
+            df.to_csv(output_path, index=False, encoding='utf-8')
+        else:
+            with open(output_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f, lineterminator='\n')  # same line endings as to_csv
+                writer.writerow(self._COLUMNS)
+                # _COLUMNS-ordered tuples built in C, cheaper than DictWriter
+                writer.writerows(map(itemgetter(*self._COLUMNS), reviews))
         print(f"\n✓ Saved {len(reviews)} reviews to {output_path}")
         
         return output_path
@@ -115,13 +244,12 @@ class SteamScraperSimple:
 
 # Test it directly
 if __name__ == "__main__":
-    scraper = SteamScraperSimple()
-    
-    app_id = "730"  # CS2
-    reviews = scraper.scrape_reviews(app_id, max_reviews=20)
-    
-    if reviews:
-        scraper.save_to_csv(reviews)
-        print("\n✅ Test successful!")
-    else:
-        print("\n❌ Test failed")
\ No newline at end of file
+    with SteamScraperSimple() as scraper:
+        app_id = "730"  # CS2
+        reviews = scraper.scrape_reviews(app_id, max_reviews=20)
+        
+        if reviews:
+            scraper.save_to_csv(reviews)
+            print("\n✅ Test successful!")
+        else:
+            print("\n❌ Test failed")
\ No newline at end of file
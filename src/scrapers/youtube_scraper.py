@@ -3,25 +3,212 @@ YouTube Comment Scraper
 Fetches comments from YouTube videos using the YouTube Data API
 """
 
+import csv
 import os
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-import pandas as pd
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from operator import itemgetter
 from tqdm import tqdm
-import time
+
+try:
+    from orjson import loads as json_loads  # optional: faster JSON decoding
+except ImportError:
+    from json import loads as json_loads
+
+# REST endpoint of the YouTube Data API v3
+API_URL = 'https://www.googleapis.com/youtube/v3/'
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 503}
+
+# 403 reasons that mean "slow down" (quotaExceeded is final for the day)
+RETRY_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+MAX_RETRIES = 5
+
+# Most IDs videos.list accepts in one call
+VIDEO_IDS_PER_REQUEST = 50
+
+# Partial responses: only the fields the scraper reads
+VIDEO_FIELDS = 'etag,items(id,snippet(title,channelTitle,publishedAt),statistics(viewCount,likeCount,commentCount))'
+_COMMENT_FIELDS = 'id,snippet(authorDisplayName,textDisplay,likeCount,publishedAt,updatedAt)'
+THREAD_FIELDS = f'nextPageToken,etag,items(snippet/topLevelComment({_COMMENT_FIELDS}))'
+THREAD_WITH_REPLIES_FIELDS = (
+    f'nextPageToken,etag,items(snippet/topLevelComment({_COMMENT_FIELDS}),'
+    f'replies/comments({_COMMENT_FIELDS}))'
+)
+
+# Seconds a cached response is used without asking the API again
+CACHE_TTL = {'videos': 24 * 3600, 'commentThreads': 6 * 3600}
+
+# Seconds a stale cached response is kept for ETag revalidation
+CACHE_EXPIRE = 7 * 24 * 3600
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by every request of a scraper"""
+    
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate (float): Requests per second on average
+            burst (int): Requests allowed back to back (defaults to rate)
+        """
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until a request may be sent"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            # Take the token now; a negative balance is a reservation to wait for
+            self.tokens -= 1
+            wait = max(self.resume_at - now, -self.tokens / self.rate)
+        
+        if wait > 0:
+            time.sleep(wait)
+    
+    def pause(self, seconds):
+        """Hold back all requests for the given number of seconds"""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
 
 class YouTubeScraper:
-    def __init__(self, api_key):
+    # Column order of the saved comments
+    _COLUMNS = [
+        'comment_id', 'video_id', 'video_title', 'author', 'text', 'like_count',
+        'published_at', 'updated_at', 'is_reply', 'parent_id', 'scraped_at'
+    ]
+    
+    def __init__(self, api_key, requests_per_second=10, cache_dir=None):
         """
         Initialize YouTube scraper with API key
         
         Args:
             api_key (str): YouTube Data API key
+            requests_per_second (float): Request rate shared by all threads
+            cache_dir (str): Keep API responses in an on-disk cache here
+                (needs diskcache); None disables caching
         """
         self.api_key = api_key
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        
+        self.cache = None
+        if cache_dir is not None:
+            from diskcache import Cache
+            self.cache = Cache(cache_dir)
+        
+        # Video metadata already fetched in this session, by video ID
+        self._video_info_cache = {}
         
+        # One pooled session for every API call; it is safe to share
+        # between the threads of scrape_multiple_videos
+        self.session = requests.Session()
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=20, max_retries=3)
+        self.session.mount('https://', adapter)
+    
+    def close(self):
+        """Close the pooled HTTP connections and the response cache"""
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _get(self, resource, **params):
+        """
+        Call a YouTube Data API list method
+        
+        Args:
+            resource (str): API resource, e.g. 'videos' or 'commentThreads'
+            **params: Query parameters (None values are left out)
+            
+        Returns:
+            dict: Decoded JSON response
+        """
+        cache_key = cached = headers = None
+        if self.cache is not None:
+            cache_key = (resource, tuple(sorted((k, v) for k, v in params.items() if v is not None)))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if time.time() - cached['fetched_at'] < CACHE_TTL.get(resource, 0):
+                    return cached['data']
+                
+                # Stale: let the API answer 304 Not Modified if nothing changed
+                if cached['etag']:
+                    headers = {'If-None-Match': cached['etag']}
+        
+        params['key'] = self.api_key
+        
+        for attempt in range(MAX_RETRIES + 1):
+            self.rate_limiter.acquire()
+            response = self.session.get(API_URL + resource, params=params,
+                                        headers=headers, timeout=10)
+            
+            retry = self._should_retry(response)
+            if retry or response.headers.get('X-RateLimit-Remaining') == '0':
+                # Back off every thread, not just this one
+                self.rate_limiter.pause(self._retry_delay(response, attempt))
+            if not retry or attempt == MAX_RETRIES:
+                break
+        
+        if cached is not None and response.status_code == 304:
+            data = cached['data']
+        else:
+            response.raise_for_status()
+            data = json_loads(response.content)
+        
+        if cache_key is not None:
+            entry = {
+                'data': data,
+                'etag': response.headers.get('ETag') or data.get('etag'),
+                'fetched_at': time.time()
+            }
+            self.cache.set(cache_key, entry, expire=CACHE_EXPIRE)
+        
+        return data
+    
+    @staticmethod
+    def _should_retry(response):
+        """Whether a failed response is worth sending again"""
+        if response.status_code in RETRY_STATUSES:
+            return True
+        if response.status_code != 403:
+            return False
+        
+        try:
+            reason = response.json()['error']['errors'][0]['reason']
+        except (ValueError, KeyError, IndexError, TypeError):
+            return False
+        return reason in RETRY_REASONS
+    
+    @staticmethod
+    def _retry_delay(response, attempt):
+        """Seconds to wait: the server's Retry-After, else exponential backoff with jitter"""
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return int(retry_after)
+        return min(2 ** attempt, 60) + random.uniform(0, 1)
+    
     def get_video_info(self, video_id):
         """
         Get basic information about a video
@@ -32,29 +219,49 @@ class YouTubeScraper:
         Returns:
             dict: Video information
         """
-        try:
-            request = self.youtube.videos().list(
-                part='snippet,statistics',
-                id=video_id
-            )
-            response = request.execute()
+        return self.get_videos_info([video_id]).get(video_id)
+    
+    def get_videos_info(self, video_ids):
+        """
+        Get basic information about several videos, 50 per API call
+        
+        Args:
+            video_ids (list): YouTube video IDs
             
-            if response['items']:
-                video = response['items'][0]
-                return {
-                    'video_id': video_id,
-                    'title': video['snippet']['title'],
-                    'channel': video['snippet']['channelTitle'],
-                    'published_at': video['snippet']['publishedAt'],
-                    'view_count': video['statistics'].get('viewCount', 0),
-                    'like_count': video['statistics'].get('likeCount', 0),
-                    'comment_count': video['statistics'].get('commentCount', 0)
-                }
-        except HttpError as e:
+        Returns:
+            dict: Video information keyed by video ID (unknown IDs are left out)
+        """
+        videos_info = {}
+        missing = []
+        for video_id in dict.fromkeys(video_ids):
+            if video_id in self._video_info_cache:
+                videos_info[video_id] = self._video_info_cache[video_id]
+            else:
+                missing.append(video_id)
+        
+        try:
+            for start in range(0, len(missing), VIDEO_IDS_PER_REQUEST):
+                chunk = missing[start:start + VIDEO_IDS_PER_REQUEST]
+                response = self._get('videos', part='snippet,statistics', fields=VIDEO_FIELDS,
+                                     id=','.join(chunk), maxResults=len(chunk))
+                
+                for video in response.get('items', []):
+                    videos_info[video['id']] = {
+                        'video_id': video['id'],
+                        'title': video['snippet']['title'],
+                        'channel': video['snippet']['channelTitle'],
+                        'published_at': video['snippet']['publishedAt'],
+                        'view_count': video['statistics'].get('viewCount', 0),
+                        'like_count': video['statistics'].get('likeCount', 0),
+                        'comment_count': video['statistics'].get('commentCount', 0)
+                    }
+                    self._video_info_cache[video['id']] = videos_info[video['id']]
+        except requests.exceptions.RequestException as e:
             print(f"Error fetching video info: {e}")
-            return None
+        
+        return videos_info
     
-    def scrape_comments(self, video_id, max_comments=1000, include_replies=False):
+    def scrape_comments(self, video_id, max_comments=1000, include_replies=False, video_info=None):
         """
         Scrape comments from a YouTube video
         
@@ -62,15 +269,17 @@ class YouTubeScraper:
             video_id (str): YouTube video ID
             max_comments (int): Maximum number of comments to fetch
             include_replies (bool): Whether to include replies to comments
+            video_info (dict): Result of get_video_info(), if already fetched
             
         Returns:
-            list: List of comment dictionaries
+            list: List of comment dictionaries, keyed by _COLUMNS
         """
         comments = []
         next_page_token = None
         
         print(f"Scraping comments from video: {video_id}")
-        video_info = self.get_video_info(video_id)
+        if video_info is None:
+            video_info = self.get_video_info(video_id)
         
         if not video_info:
             print("Could not fetch video info")
@@ -82,23 +291,29 @@ class YouTubeScraper:
         with tqdm(total=min(max_comments, int(video_info['comment_count']))) as pbar:
             while len(comments) < max_comments:
                 try:
-                    request = self.youtube.commentThreads().list(
-                        part='snippet,replies',
+                    response = self._get(
+                        'commentThreads',
+                        part='snippet,replies' if include_replies else 'snippet',
+                        fields=THREAD_WITH_REPLIES_FIELDS if include_replies else THREAD_FIELDS,
                         videoId=video_id,
                         maxResults=100,  # Max allowed by API
                         pageToken=next_page_token,
                         textFormat='plainText',
                         order='relevance'  # or 'time'
                     )
-                    response = request.execute()
+                    scraped_at = datetime.now().isoformat()
+                    title = video_info['title']
+                    page_start = len(comments)
                     
-                    for item in response['items']:
+                    for item in response.get('items', []):
                         # Top-level comment
-                        top_comment = item['snippet']['topLevelComment']['snippet']
-                        comment_data = {
-                            'comment_id': item['snippet']['topLevelComment']['id'],
+                        top_level = item['snippet']['topLevelComment']
+                        top_id = top_level['id']
+                        top_comment = top_level['snippet']
+                        comments.append({
+                            'comment_id': top_id,
                             'video_id': video_id,
-                            'video_title': video_info['title'],
+                            'video_title': title,
                             'author': top_comment['authorDisplayName'],
                             'text': top_comment['textDisplay'],
                             'like_count': top_comment['likeCount'],
@@ -106,67 +321,77 @@ class YouTubeScraper:
                             'updated_at': top_comment['updatedAt'],
                             'is_reply': False,
                             'parent_id': None,
-                            'scraped_at': datetime.now().isoformat()
-                        }
-                        comments.append(comment_data)
-                        pbar.update(1)
+                            'scraped_at': scraped_at
+                        })
                         
                         # Get replies if requested
                         if include_replies and 'replies' in item:
                             for reply in item['replies']['comments']:
                                 reply_snippet = reply['snippet']
-                                reply_data = {
+                                comments.append({
                                     'comment_id': reply['id'],
                                     'video_id': video_id,
-                                    'video_title': video_info['title'],
+                                    'video_title': title,
                                     'author': reply_snippet['authorDisplayName'],
                                     'text': reply_snippet['textDisplay'],
                                     'like_count': reply_snippet['likeCount'],
                                     'published_at': reply_snippet['publishedAt'],
                                     'updated_at': reply_snippet['updatedAt'],
                                     'is_reply': True,
-                                    'parent_id': item['snippet']['topLevelComment']['id'],
-                                    'scraped_at': datetime.now().isoformat()
-                                }
-                                comments.append(reply_data)
-                                pbar.update(1)
+                                    'parent_id': top_id,
+                                    'scraped_at': scraped_at
+                                })
                         
                         if len(comments) >= max_comments:
                             break
                     
+                    pbar.update(len(comments) - page_start)
+                    
                     # Check if there are more pages
                     next_page_token = response.get('nextPageToken')
                     if not next_page_token:
                         break
                     
-                    # Small delay to respect rate limits
-                    time.sleep(0.1)
-                    
-                except HttpError as e:
+                except requests.exceptions.RequestException as e:
                     print(f"\nError fetching comments: {e}")
                     break
         
         print(f"\nScraped {len(comments)} comments")
         return comments
     
-    def scrape_multiple_videos(self, video_ids, max_comments_per_video=1000):
+    def scrape_multiple_videos(self, video_ids, max_comments_per_video=1000, max_workers=4):
         """
-        Scrape comments from multiple videos
+        Scrape comments from multiple videos concurrently
+        
+        Each video's pages are fetched in order (they are chained by
+        nextPageToken); different videos are fetched in parallel threads
+        sharing the session's connection pool.
         
         Args:
             video_ids (list): List of YouTube video IDs
             max_comments_per_video (int): Max comments per video
+            max_workers (int): Number of videos scraped at once
             
         Returns:
-            list: Combined list of all comments
+            list: Combined list of all comments, in video_ids order; a video
+                listed more than once is scraped once
         """
-        all_comments = []
+        video_ids = list(dict.fromkeys(video_ids))
+        
+        # Metadata for all videos in one call per 50 IDs, instead of one per video
+        videos_info = self.get_videos_info(video_ids)
         
-        for video_id in video_ids:
-            comments = self.scrape_comments(video_id, max_comments_per_video)
-            all_comments.extend(comments)
-            print(f"Total comments collected so far: {len(all_comments)}\n")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                lambda video_id: self.scrape_comments(
+                    video_id, max_comments_per_video, video_info=videos_info.get(video_id, {})
+                ),
+                video_ids
+            )
+            # Flatten once at the end instead of growing the list per video
+            all_comments = list(chain.from_iterable(results))
         
+        print(f"Total comments collected: {len(all_comments)}\n")
         return all_comments
     
     def save_to_csv(self, comments, filename='youtube_comments.csv'):
@@ -174,16 +399,21 @@ class YouTubeScraper:
         Save comments to CSV file
         
         Args:
-            comments (list): List of comment dictionaries
+            comments (list): Comment dictionaries from scrape_comments()
             filename (str): Output filename
         """
         if not comments:
             print("No comments to save")
             return
         
-        df = pd.DataFrame(comments)
+        # Rows go straight to the file; no DataFrame copy of the whole list.
+        # itemgetter turns each dict into a _COLUMNS-ordered tuple in C,
+        # cheaper than DictWriter's per-row key checks
         output_path = os.path.join('data', 'raw', filename)
-        df.to_csv(output_path, index=False, encoding='utf-8')
+        with open(output_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(self._COLUMNS)
+            writer.writerows(map(itemgetter(*self._COLUMNS), comments))
         print(f"Saved {len(comments)} comments to {output_path}")
         
         return output_path
@@ -200,11 +430,10 @@ if __name__ == "__main__":
         print("Error: YOUTUBE_API_KEY not found in .env file")
         exit(1)
     
-    scraper = YouTubeScraper(api_key)
-    
-    # Example: Scrape comments from a video
-    video_id = "0VoPYvl-e9A"  # Replace with actual video ID
-    comments = scraper.scrape_comments(video_id, max_comments=100, include_replies=True)
-    
-    # Save to CSV
-    scraper.save_to_csv(comments)
\ No newline at end of file
+    with YouTubeScraper(api_key) as scraper:
+        # Example: Scrape comments from a video
+        video_id = "0VoPYvl-e9A"  # Replace with actual video ID
+        comments = scraper.scrape_comments(video_id, max_comments=100, include_replies=True)
+        
+        # Save to CSV
+        scraper.save_to_csv(comments)
\ No newline at end of file
@@ -0,0 +1,21 @@
+"""Regression tests for TextPreprocessor."""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from preprocessing import TextPreprocessor
+
+
+def test_preprocess_series_matches_preprocess_with_non_ascii_stopwords():
+    preprocessor = TextPreprocessor(cleaner_config={'lowercase': False})
+    # str.lower() of these is not plain ASCII lowercasing ('İ' -> 'i̇')
+    preprocessor.add_stopwords(['ÄBC', 'İx'])
+    texts = pd.Series(['ÄBC ok', 'İx y', 'The cat sat', None])
+    
+    result = preprocessor.preprocess_series(texts, remove_stopwords=True).tolist()
+    
+    assert result == ['ok', 'y', 'cat sat', '']
+    assert result[:3] == [preprocessor.preprocess(t, remove_stopwords=True) for t in texts[:3]]